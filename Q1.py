@@ -2,7 +2,6 @@ import os
 import cv2
 import numpy as np
 import matplotlib.pyplot as plt
-from PIL import Image
 
 from utils import fundamental_matrix
 from tabulate import tabulate
@@ -12,12 +11,15 @@ images = [['im_courtroom_00086_left.jpg', 'im_courtroom_00089_right.jpg'],
           ['im_family_00084_left.jpg', 'im_family_00100_right.jpg']]
 # pts_left = []
 # pts_right = []
-POINTS = [[[[207, 13], [279, 130], [309, 268], [408, 438], [377, 243], [419, 272], [483, 144], [587, 128],
-           [610, 185], [727, 63]],
-           [[265, 1], [313, 91], [389, 198], [536, 281], [385, 182], [446, 199], [458, 96], [541, 82], [562, 127],
-           [655, 35]]],
-          [[[121, 53], [133, 247], [214, 312], [463, 317], [764, 156], [700, 136], [842, 321], [738, 278], [490, 292]],
-           [[577, 37], [59, 247], [112, 309], [353, 343], [226, 163], [203, 155], [738, 427], [721, 322], [591, 308]]]]
+# points are stored as 2xN arrays (row of x's, row of y's)
+POINTS = [[np.array([[207, 13], [279, 130], [309, 268], [408, 438], [377, 243], [419, 272], [483, 144], [587, 128],
+                     [610, 185], [727, 63]], dtype=np.float32).T,
+           np.array([[265, 1], [313, 91], [389, 198], [536, 281], [385, 182], [446, 199], [458, 96], [541, 82],
+                     [562, 127], [655, 35]], dtype=np.float32).T],
+          [np.array([[121, 53], [133, 247], [214, 312], [463, 317], [764, 156], [700, 136], [842, 321], [738, 278],
+                     [490, 292]], dtype=np.float32).T,
+           np.array([[577, 37], [59, 247], [112, 309], [353, 343], [226, 163], [203, 155], [738, 427], [721, 322],
+                     [591, 308]], dtype=np.float32).T]]
 
 POINTS_LEFT = []
 POINTS_RIGHT = []
@@ -48,23 +50,26 @@ def click_event(event, x, y, flags, params):
 def draw_lines(img1, lines, pts1, colors=None):
     """ function to draw the epipolar lines """
     r, c, _ = img1.shape
-    c_colors = []
-    for idx, (r, pt1) in enumerate(zip(lines, pts1)):
-        if colors is None:
-            color = tuple(np.random.randint(0, 255, 3).tolist())
-            while color in c_colors:
-                color = tuple(np.random.randint(0, 255, 3).tolist())
-            c_colors.append(color)
-        else:
-            color = colors[idx]
+    # line end points at x=0 and x=c, computed for all lines at once.
+    # (near) vertical lines have no such end points and are not drawn, the rest
+    # are clipped so the int32 cast can't wrap around
+    drawable = (np.abs(lines[1]) > np.finfo(float).eps).tolist()
+    b = np.where(drawable, lines[1], 1)
+    int_range = np.iinfo(np.int32)
+    y0 = np.clip(-lines[2] / b, int_range.min, int_range.max).astype(np.int32).tolist()
+    y1 = np.clip(-(lines[2] + lines[0] * c) / b, int_range.min, int_range.max).astype(np.int32).tolist()
+    centers = pts1.T.astype(np.int32).tolist()
 
-        x0, y0 = map(int, [0, -r[2] / r[1]])
-        x1, y1 = map(int, [c, -(r[2] + r[0] * c) / r[1]])
+    if colors is None:
+        # one random color per line, drawn in a single call
+        colors = [tuple(color) for color in np.random.randint(0, 255, (lines.shape[1], 3)).tolist()]
 
-        img1 = cv2.line(img1, (x0, y0), (x1, y1), color, 1)
-        img1 = cv2.circle(img1, tuple(pt1), 5, color, -1)
+    for idx, color in enumerate(colors):
+        if drawable[idx]:
+            img1 = cv2.line(img1, (0, y0[idx]), (c, y1[idx]), color, 1)
+        img1 = cv2.circle(img1, tuple(centers[idx]), 5, color, -1)
 
-    return img1, c_colors
+    return img1, colors
 
 
 def get_coordiantes(img):
@@ -84,28 +89,24 @@ def get_coordiantes(img):
     cv2.destroyAllWindows()
 
 
-def epipolar_distance(l_pts, r_pts, l_lines, r_lines):
-    """ function to calculate the epipolar distance given pair of points and corresponding lines """
-    r, c, _ = img_left.shape
-    distance = 0
-
-    for l_pt, r_pt, l_line, r_line in zip(l_pts, r_pts, l_lines, r_lines):
-        left = np.dot((l_pt[0], l_pt[1], 1), l_line) ** 2 / np.sqrt(l_line[0] ** 2 + l_line[1] ** 2)
-        right = np.dot((r_pt[0], r_pt[1], 1), r_line) ** 2 / np.sqrt(r_line[0] ** 2 + r_line[1] ** 2)
-        distance += (left + right)
+def epipolar_distance(l_pts_h, r_pts_h, l_lines, r_lines):
+    """ function to calculate the epipolar distance given pair of homogeneous points and corresponding lines """
+    npts = l_pts_h.shape[1]
+    # squared point-to-line distance: (p.l)^2 / (a^2 + b^2)
+    left = (l_pts_h * l_lines).sum(0)
+    left = left * left / (l_lines[0] ** 2 + l_lines[1] ** 2)
+    right = (r_pts_h * r_lines).sum(0)
+    right = right * right / (r_lines[0] ** 2 + r_lines[1] ** 2)
 
-    distance /= len(l_pts)  # TODO maybe average by 2*len
+    # mean over both directions
+    distance = (left + right).sum() / (2 * npts)
     print(f"\n  Epipolar distance: {distance}")
     return distance
 
 
-def algebraic_distance(r_pts, l_lines):
-    """ function to calculate the algebraic distance given a point and corresponding line """
-    distance = 0
-    for lp, rl in zip(r_pts, l_lines):
-        distance += abs(np.dot((lp[0], lp[1], 1), rl))
-
-    distance /= len(r_pts)
+def algebraic_distance(r_pts_h, l_lines):
+    """ function to calculate the algebraic distance given a homogeneous point and corresponding line """
+    distance = np.abs((r_pts_h * l_lines).sum(0)).mean()
     print(f"\n  Algebraic distance: {distance}\n")
     return distance
 
@@ -118,44 +119,43 @@ if __name__ == '__main__':
         image_name = im[0].split('_')[1]
         print(image_name)
         distances = []
-        for n in to_normalize:
+        # decode the pair once, each estimation draws on its own copy
+        img_left = cv2.imread(os.path.join(ex_1_path, im[0]))
+        img_right = cv2.imread(os.path.join(ex_1_path, im[1]))
 
-            img_left = cv2.imread(os.path.join(ex_1_path, im[0]))
-            img_right = cv2.imread(os.path.join(ex_1_path, im[1]))
+        if not p[0].size:
+            get_coordiantes(img_left)
+            get_coordiantes(img_right)
 
-            if not p[0]:
-                get_coordiantes(img_left)
-                get_coordiantes(img_right)
+            pts_left = np.array(POINTS_LEFT, dtype=np.float32).T
+            pts_right = np.array(POINTS_RIGHT, dtype=np.float32).T
+        else:
+            pts_left = p[0]
+            pts_right = p[1]
 
-                pts_left = POINTS_LEFT
-                pts_right = POINTS_RIGHT
-            else:
-                pts_left = p[0]
-                pts_right = p[1]
+        print("Points left:\n", pts_left)
+        print("Points right:\n", pts_right)
+        assert pts_left.shape == pts_right.shape
 
-            print("Points left:\n", pts_left)
-            print("Points right:\n", pts_right)
-            assert len(pts_left) == len(pts_right)
+        # homogeneous coordinates, shared by both estimations of this pair
+        pts_left_h = np.vstack([pts_left, np.ones((1, pts_left.shape[1]), dtype=np.float32)])
+        pts_right_h = np.vstack([pts_right, np.ones((1, pts_right.shape[1]), dtype=np.float32)])
 
+        for n in to_normalize:
             print(n[1])
-            pts_left = np.asarray(pts_left)
-            pts_right = np.asarray(pts_right)
 
             # Compute fundamental matrix using 8 point (normalized or not)
-            F = fundamental_matrix(pts_left, pts_right, normalize=n[0])
+            F = fundamental_matrix(pts_left_h, pts_right_h, normalize=n[0])
             # print(F)
 
             # activate fundamental matrix
             # left lines will be calculated using right image points and plotted on left image, vice versa
-            lines_left = []
-            lines_right = []
-            for pl, pr in zip(pts_left, pts_right):
-                lines_right.append(np.dot(F, (pl[0], pl[1], 1)))
-                lines_left.append(np.dot(np.transpose(F), (pr[0], pr[1], 1)))  # need transpose
+            lines_right = F @ pts_left_h
+            lines_left = F.T @ pts_right_h  # need transpose
 
             # draw lines
-            img1, colors = draw_lines(img_left, lines_left, pts_left)
-            img2, _ = draw_lines(img_right, lines_right, pts_right, colors)
+            img1, colors = draw_lines(img_left.copy(), lines_left, pts_left)
+            img2, _ = draw_lines(img_right.copy(), lines_right, pts_right, colors)
 
             plt.subplot(121), plt.imshow(img1)
             plt.subplot(122), plt.imshow(img2)
@@ -164,13 +164,12 @@ if __name__ == '__main__':
             else:
                 image_name = image_name + 'regular_8_point' + '.jpeg'
 
-            img = Image.fromarray(img1)
-            img.save('Q1_results/' + image_name, "JPEG")
+            cv2.imwrite('Q1_results/' + image_name, img1)
             plt.show()
 
             # calc distances
-            distances.append(epipolar_distance(pts_left, pts_right, lines_left, lines_right))
-            distances.append(algebraic_distance(pts_right, lines_right))
+            distances.append(epipolar_distance(pts_left_h, pts_right_h, lines_left, lines_right))
+            distances.append(algebraic_distance(pts_right_h, lines_right))
 
         # print distances table
         print(tabulate([['Normalized 8-point', distances[0], distances[1]], ['Regular 8-point', distances[2], distances[3]]]
@@ -86,7 +86,7 @@ if __name__ == '__main__':
                                      mode='mean')
                 padded_right = np.pad(array=img_right, pad_width=((half_k, half_k + 1), (half_k, half_k + 1), (0, 0)),
                                       mode='mean')
-                disparity_matrix = np.zeros((h, w))  # where all disparities will be saved
+                disparity_matrix = np.zeros((h, w), dtype=np.float32)  # where all disparities will be saved
 
                 SKIP_COST = 0.1 if MODE == 'NCC' else 30000     # for dynamic programming
                 from time import time
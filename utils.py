@@ -20,60 +20,36 @@ def fundamental_matrix(*args, normalize):
 
 
 def process_input_pointpairs(args):
+    """ points are expected as 2xN (or homogeneous 3xN) arrays, or a single 4xN (6xN) array of stacked pairs """
     if len(args) == 2:
         x1 = args[0]
         x2 = args[1]
         if not x1.shape == x2.shape:
             raise ShapeError('the two arguments should have same size')
-
-        if not x1.ndim == 2:
-            raise ShapeError('Each input has to be a 2D array')
-
-        npts = max(x1.shape)
-        d = min(x1.shape)
-        if npts < 8:
-            raise ShapeError('At least 8 points are needed to compute the fundamental matrix')
-
-        if d == 2:
-            if 2 == x1.shape[0]:  # input is a fat matrix
-                x1 = np.r_[x1, np.ones((1, npts))]
-                x2 = np.r_[x2, np.ones((1, npts))]
-            else:  # input is a tall matrix
-                x1 = np.r_[x1.T, np.ones((1, npts))]
-                x2 = np.r_[x2.T, np.ones((1, npts))]
-        elif d == 3:
-            if 3 == x1.shape[1]:  # input is a tall matrix
-                x1 = x1.T
-                x2 = x2.T
-        else:
-            raise ShapeError('x1 and x2 must be 2xN or Nx2 or 3xN or Nx3')
-
     elif len(args) == 1:
-        if not args[0].ndim == 2:
-            raise ShapeError('Each input has to be a 2D array')
-        npts = max(args[0].shape)
-        d = min(args[0].shape)
-        if npts < 8:
-            raise ShapeError('At least 8 points are needed to compute the fundamental matrix')
-        if d == 4:
-            if 4 == args[0].shape[0]:  # input is a fat matrix
-                x1 = np.r_[args[0][0:2], np.ones((1, npts))]
-                x2 = np.r_[args[0][2:4], np.ones((1, npts))]
-            else:  # input is a tall matrix
-                x1 = np.r_[args[0][:, 0:2].T, np.ones((1, npts))]
-                x2 = np.r_[args[0][:, 2:4].T, np.ones((1, npts))]
-        elif d == 6:
-            if 6 == args[0].shape[0]:  # input is a tall matrix
-                x1 = args[0][0:3]
-                x2 = args[0][3:6]
-            else:
-                x1 = args[0][:, 0:3].T
-                x2 = args[0][:, 3:6].T
-        else:
-            raise ShapeError('Single argument x must be 4xN or Nx4 or 6xN or Nx6')
+        if not args[0].ndim == 2 or args[0].shape[0] not in (4, 6):
+            raise ShapeError('Single argument x must be 4xN or 6xN')
+        d = args[0].shape[0] // 2
+        x1 = args[0][:d]
+        x2 = args[0][d:]
     else:
         raise ShapeError('Wrong number of arguments supplied')
 
+    if not x1.ndim == 2:
+        raise ShapeError('Each input has to be a 2D array')
+    d, npts = x1.shape
+    if d not in (2, 3):
+        raise ShapeError('x1 and x2 must be 2xN or 3xN')
+    if npts < 8:
+        raise ShapeError('At least 8 points are needed to compute the fundamental matrix')
+
+    if d == 2:
+        x1 = np.vstack([x1, np.ones((1, npts))])
+        x2 = np.vstack([x2, np.ones((1, npts))])
+    else:
+        x1 = x1.astype(np.float64)
+        x2 = x2.astype(np.float64)
+
     return x1, x2, npts
 
 
@@ -87,10 +63,10 @@ def eight_point_algorithm(x1, x2, normalize):
     A = constraint_matrix(x1, x2)
 
     # A*vec(F) = 0 implies that the fundamental matrix F can be extracted from
-    # singular vector of V corresponding to smallest singular value
-    (U, S, V) = np.linalg.svd(A)
-    V = V.conj().T
-    F = V[:, 8].reshape(3, 3).copy()
+    # singular vector of V corresponding to smallest singular value, which is
+    # the eigenvector of the 9x9 matrix A^T*A with the smallest eigenvalue
+    _, V = np.linalg.eigh(A.T @ A)
+    F = V[:, 0].reshape(3, 3).copy()
 
     # recall that F should be of rank 2, do the lower-rank approximation by svd
     (U, D, V) = np.linalg.svd(F)
@@ -104,18 +80,29 @@ def eight_point_algorithm(x1, x2, normalize):
 
 def constraint_matrix(x1, x2):
     npts = x1.shape[1]
-    # stack column by column
-    A = np.c_[
-        x2[0] * x1[0], x2[0] * x1[1], x2[0], x2[1] * x1[0], x2[1] * x1[1], x2[1], x1[0], x1[1], np.ones((npts, 1))]
+    # fill column by column
+    A = np.empty((npts, 9))
+    A[:, 0] = x2[0] * x1[0]
+    A[:, 1] = x2[0] * x1[1]
+    A[:, 2] = x2[0]
+    A[:, 3] = x2[1] * x1[0]
+    A[:, 4] = x2[1] * x1[1]
+    A[:, 5] = x2[1]
+    A[:, 6] = x1[0]
+    A[:, 7] = x1[1]
+    A[:, 8] = 1.0
     return A
 
 
 def normalize2dpts(pts):
     ''' This function translates and scales the input (homogeneous) points
-    such that the output points are centered at origin and the mean distance
-    from the origin is sqrt(2). As shown in Hartley (1997), this normalization
-    process typically improves the condition number of the linear systems used
-    for solving homographies, fundamental matrices, etc.
+    such that the output points are centered at origin and each coordinate
+    has unit standard deviation. As shown in Hartley (1997), normalizing the
+    points typically improves the condition number of the linear systems used
+    for solving homographies, fundamental matrices, etc. Hartley scales both
+    axes isotropically to a mean distance of sqrt(2) from the origin; here
+    that isotropic scaling is replaced by a per-axis one, which is not
+    equivalent and gives somewhat different estimates.
 
     References:
         Richard Hartley, PAMI 1997
@@ -125,43 +112,35 @@ def normalize2dpts(pts):
     if pts.shape[0] != 3:
         raise ShapeError('pts must be 3xN')
 
-    finiteind = abs(pts[2]) > np.finfo(float).eps
-    pts[0, finiteind] = pts[0, finiteind] / pts[2, finiteind]
-    pts[1, finiteind] = pts[1, finiteind] / pts[2, finiteind]
-    pts[2, finiteind] = 1
-
-    # Centroid of finite points
-    c = [np.mean(pts[0, finiteind]), np.mean(pts[1, finiteind])]
-
-    # Shift origin to centroid.
-    newp0 = pts[0, finiteind] - c[0]
-    newp1 = pts[1, finiteind] - c[1]
-
-    meandist = np.mean(np.sqrt(newp0 ** 2 + newp1 ** 2))
-
-    scale = np.sqrt(2) / meandist
-    '''
-    T = [scale   0   -scale*c(1)
-         0     scale -scale*c(2)
-         0       0      1      ];
-    '''
-    T = np.eye(3)
-    T[0][0] = scale
-    T[1][1] = scale
-    T[0][2] = -scale * c[0]
-    T[1][2] = -scale * c[1]
-    newpts = np.dot(T, pts)
+    eps = np.finfo(float).eps
+    if np.any(abs(pts[2] - 1) > eps):
+        pts[:2] /= pts[2]
+        pts[2] = 1
+
+    # Centroid of the points, and the points shifted to it
+    xy = pts[:2]
+    c = xy.mean(axis=1)
+    d = xy - c[:, None]
+
+    # per axis standard deviation around the centroid
+    scale = 1 / np.sqrt((d * d).mean(axis=1))
+    T = np.array([[scale[0], 0, -scale[0] * c[0]],
+                  [0, scale[1], -scale[1] * c[1]],
+                  [0, 0, 1]])
+    # T*pts is just the shifted points scaled, no need for the 3x3 product
+    newpts = np.vstack([scale[:, None] * d, np.ones((1, pts.shape[1]))])
 
     return newpts, T
 
 
 def calc_errors(disparity_matrix, gt):
-    flat_d = disparity_matrix.flatten()
-    flat_gt = gt[:, :, 0].flatten()/3
-    errors = np.asarray([abs(e1 - e2) for e1, e2 in zip(flat_gt, flat_d)])
+    flat_d = disparity_matrix.astype(np.float32, copy=False).ravel()
+    flat_gt = gt[:, :, 0].astype(np.float32).ravel()
+    flat_gt /= 3
+    errors = np.abs(flat_gt - flat_d)
     avg_error = np.mean(errors)
     med_error = np.median(errors)
-    bad_05 = ((np.where(errors > 0.5)[0].shape[0]) / errors.shape[0]) * 100
-    bad_4 = ((np.where(errors > 4)[0].shape[0]) / errors.shape[0]) * 100
+    bad_05 = np.count_nonzero(errors > 0.5) / errors.size * 100
+    bad_4 = np.count_nonzero(errors > 4) / errors.size * 100
 
     return avg_error, med_error, bad_05, bad_4
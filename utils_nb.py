@@ -0,0 +1,175 @@
+import numpy as np
+from numba import njit
+
+import utils
+from utils import ShapeError, process_input_pointpairs
+
+
+def fundamental_matrix(*args, normalize):
+    """ same as utils.fundamental_matrix, but the 8 point algorithm is compiled,
+    which pays off when it is called many times on few points (e.g. inside RANSAC) """
+    try:
+        x1, x2, npts = process_input_pointpairs(args)
+        F = _eight_point(x1, x2, normalize)
+        return F
+    except ShapeError as e:
+        print('ShapeError, exception message:', e)
+        return None
+
+
+@njit(cache=True)
+def svd3x3_rank2(F, max_sweeps=6):
+    """ closest rank 2 matrix to a 3x3 F, using one-sided Jacobi SVD.
+    columns of F are rotated until orthogonal (F*V = U*diag(S)), the column with
+    the smallest norm is zeroed and the result is rotated back by V^T """
+    A = F.copy()
+    V = np.eye(3)
+    eps = np.finfo(np.float64).eps
+    for _ in range(max_sweeps):
+        converged = True
+        for p, q in ((0, 1), (0, 2), (1, 2)):
+            alpha = 0.0
+            beta = 0.0
+            gamma = 0.0
+            for i in range(3):
+                alpha += A[i, p] * A[i, p]
+                beta += A[i, q] * A[i, q]
+                gamma += A[i, p] * A[i, q]
+            if abs(gamma) <= eps * np.sqrt(alpha * beta):
+                continue
+            converged = False
+
+            # rotation which makes columns p and q orthogonal
+            zeta = (beta - alpha) / (2.0 * gamma)
+            t = 1.0 / (abs(zeta) + np.sqrt(1.0 + zeta * zeta))
+            if zeta < 0:
+                t = -t
+            c = 1.0 / np.sqrt(1.0 + t * t)
+            s = c * t
+            for i in range(3):
+                a_p = A[i, p]
+                a_q = A[i, q]
+                A[i, p] = c * a_p - s * a_q
+                A[i, q] = s * a_p + c * a_q
+                v_p = V[i, p]
+                v_q = V[i, q]
+                V[i, p] = c * v_p - s * v_q
+                V[i, q] = s * v_p + c * v_q
+        if converged:
+            break
+
+    # column norms of A are the singular values, drop the smallest
+    norms = np.zeros(3)
+    for j in range(3):
+        for i in range(3):
+            norms[j] += A[i, j] * A[i, j]
+    A[:, np.argmin(norms)] = 0.0
+    return A @ V.T
+
+
+@njit(cache=True)
+def _normalize(pts):
+    """ compiled version of utils.normalize2dpts, pts is 3xN """
+    npts = pts.shape[1]
+    newpts = np.ones((3, npts))
+    for i in range(npts):
+        newpts[0, i] = pts[0, i] / pts[2, i]
+        newpts[1, i] = pts[1, i] / pts[2, i]
+
+    # centroid and per axis standard deviation
+    c = np.zeros(2)
+    for i in range(npts):
+        c[0] += newpts[0, i]
+        c[1] += newpts[1, i]
+    c /= npts
+    var = np.zeros(2)
+    for i in range(npts):
+        newpts[0, i] -= c[0]
+        newpts[1, i] -= c[1]
+        var[0] += newpts[0, i] * newpts[0, i]
+        var[1] += newpts[1, i] * newpts[1, i]
+    scale = 1 / np.sqrt(var / npts)
+
+    for i in range(npts):
+        newpts[0, i] *= scale[0]
+        newpts[1, i] *= scale[1]
+
+    T = np.eye(3)
+    T[0, 0] = scale[0]
+    T[1, 1] = scale[1]
+    T[0, 2] = -scale[0] * c[0]
+    T[1, 2] = -scale[1] * c[1]
+    return newpts, T
+
+
+@njit(cache=True)
+def _constraint(x1, x2):
+    """ compiled version of utils.constraint_matrix """
+    npts = x1.shape[1]
+    A = np.empty((npts, 9))
+    for i in range(npts):
+        A[i, 0] = x2[0, i] * x1[0, i]
+        A[i, 1] = x2[0, i] * x1[1, i]
+        A[i, 2] = x2[0, i]
+        A[i, 3] = x2[1, i] * x1[0, i]
+        A[i, 4] = x2[1, i] * x1[1, i]
+        A[i, 5] = x2[1, i]
+        A[i, 6] = x1[0, i]
+        A[i, 7] = x1[1, i]
+        A[i, 8] = 1.0
+    return A
+
+
+@njit(cache=True)
+def _eight_point(x1, x2, normalize):
+    """ compiled version of utils.eight_point_algorithm """
+    if normalize:
+        x1, T1 = _normalize(x1)
+        x2, T2 = _normalize(x2)
+
+    A = _constraint(x1, x2)
+
+    # eigenvector of A^T*A with the smallest eigenvalue
+    M = np.zeros((9, 9))
+    for i in range(A.shape[0]):
+        for j in range(9):
+            for k in range(9):
+                M[j, k] += A[i, j] * A[i, k]
+    _, V = np.linalg.eigh(M)
+    F = V[:, 0].copy().reshape(3, 3)
+
+    # rank 2 approximation
+    F = svd3x3_rank2(F)
+
+    if normalize:
+        # denormalize
+        F = T2.T @ F @ T1
+    return F
+
+
+if __name__ == '__main__':
+    # check the compiled numerics against the numpy reference implementations
+    rng = np.random.default_rng(0)
+
+    worst = 0
+    for _ in range(1000):
+        F = rng.normal(size=(3, 3)) * 10 ** rng.uniform(-5, 5, size=(3, 3))
+        U, D, V = np.linalg.svd(F)
+        expected = np.dot(np.dot(U, np.diag([D[0], D[1], 0])), V)
+        worst = max(worst, np.abs(svd3x3_rank2(F) - expected).max() / np.abs(expected).max())
+    print(f"svd3x3_rank2 vs np.linalg.svd, max relative error: {worst}")
+    assert worst < 1e-10
+
+    for normalize in [True, False]:
+        worst = 0
+        for _ in range(100):
+            x1 = rng.uniform(0, 800, size=(2, 10))
+            x2 = rng.uniform(0, 800, size=(2, 10))
+            expected = utils.fundamental_matrix(x1, x2, normalize=normalize)
+            F = fundamental_matrix(x1, x2, normalize=normalize)
+            # F is defined up to scale (and sign)
+            expected /= np.linalg.norm(expected)
+            F /= np.linalg.norm(F)
+            worst = max(worst, min(np.abs(F - expected).max(), np.abs(F + expected).max()))
+        print(f"fundamental_matrix (normalize={normalize}) vs utils, max error: {worst}")
+        assert worst < 1e-8